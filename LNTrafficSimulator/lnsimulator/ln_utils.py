@@ -1,4 +1,5 @@
 import json
+import ijson
 from tqdm import tqdm
 import pandas as pd
 
@@ -27,6 +28,16 @@ def load_temp_data(json_files, node_keys=["pub_key","last_update"], edge_keys=["
     print("All edges without loops:", len(edges_no_loops))
     return pd.concat(node_info), edges_no_loops
 
+def stream_edges(json_file, edge_keys):
+    """Stream the edges array of an LN snapshot with ijson: one edge dict at a
+    time instead of json.load-ing the whole multi-hundred-MB file, so peak
+    memory stays at the row list rather than the full parsed document."""
+    rows = []
+    with open(json_file, 'rb') as f:
+        for edge in ijson.items(f, 'edges.item'):
+            rows.append(tuple(edge.get(k) for k in edge_keys))
+    return pd.DataFrame.from_records(rows, columns=edge_keys)
+
 def generate_directed_graph(edges, policy_keys=['disabled', 'fee_base_msat', 'fee_rate_milli_msat', 'min_htlc']):
     """Generate directed graph data from undirected payment channels."""
     directed_edges = []
@@ -50,11 +61,15 @@ def generate_directed_graph(edges, policy_keys=['disabled', 'fee_base_msat', 'fe
 
 def preprocess_json_file(json_file):
     """Generate directed graph data (traffic simulator input format) from json LN snapshot file."""
-    json_files = [json_file]
     print("\ni.) Load data")
     EDGE_KEYS = ["node1_pub","node2_pub","last_update","capacity","channel_id",'node1_policy','node2_policy']
-    nodes, edges = load_temp_data(json_files, edge_keys=EDGE_KEYS)
-    print(len(nodes), len(edges))
+    edges = stream_edges(json_file, EDGE_KEYS)
+    edges["snapshot_id"] = 0
+    edges["capacity"] = edges["capacity"].astype("int64")
+    edges["last_update"] = edges["last_update"].astype("int64")
+    print("All edges:", len(edges))
+    edges = edges[edges["node1_pub"] != edges["node2_pub"]]
+    print("All edges without loops:", len(edges))
     print("Remove records with missing node policy")
     print(edges.isnull().sum() / len(edges))
     origi_size = len(edges)
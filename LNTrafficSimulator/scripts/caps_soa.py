@@ -0,0 +1,33 @@
+# scripts/caps_soa.py
+"""
+Struct-of-arrays helpers for node_caps.
+
+node_caps is logically a mapping (node, hyperedge_idx) -> capacity. Keeping it
+as a Python dict keyed by tuples costs ~200 bytes per entry and a tuple hash
+per lookup, which dominates clique expansion for large hyperedges. These
+helpers flatten the mapping into three parallel ndarrays sorted by hyperedge
+index, so each hyperedge's capacities are one contiguous slice.
+"""
+import numpy as np
+
+def node_caps_to_soa(node_caps):
+    """Flatten dict[(node, hed_idx)] -> cap into (nodes, idxs, caps) arrays sorted by hed_idx."""
+    n = len(node_caps)
+    nodes = np.empty(n, dtype=object)
+    idxs = np.empty(n, dtype=np.int32)
+    caps = np.empty(n, dtype=np.float64)
+    for i, ((node, idx), cap) in enumerate(node_caps.items()):
+        nodes[i] = node
+        idxs[i] = idx
+        caps[i] = cap
+    order = np.argsort(idxs, kind='stable')
+    return nodes[order], idxs[order], caps[order]
+
+def caps_slices(idxs, n_hyperedges):
+    """Split points into the sorted SoA arrays: hyperedge i owns slice splits[i]:splits[i+1]."""
+    return np.searchsorted(idxs, np.arange(n_hyperedges + 1))
+
+def caps_for_hyperedge(nodes, caps, splits, idx):
+    """Small node->cap dict for one hyperedge, built from its contiguous slice."""
+    lo, hi = splits[idx], splits[idx + 1]
+    return dict(zip(nodes[lo:hi], caps[lo:hi].tolist()))
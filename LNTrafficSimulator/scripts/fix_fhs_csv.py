@@ -1,5 +1,5 @@
 #!/usr/bin/env python3
-import pandas as pd, sys, os, time, random
+import pandas as pd, numpy as np, sys, os, time
 
 infile = sys.argv[1] if len(sys.argv) > 1 else "runs/fhs_5_edges.csv"
 outfile = sys.argv[2] if len(sys.argv) > 2 else infile.replace(".csv", "_fixed.csv")
@@ -11,8 +11,9 @@ df_fixed = pd.DataFrame()
 df_fixed["snapshot_id"] = 0  # all zero (can be changed per experiment)
 df_fixed["src"] = df["src"]
 df_fixed["trg"] = df["trg"]
-df_fixed["last_update"] = int(time.time())  # fake timestamp
-df_fixed["channel_id"] = [random.randint(10**14, 10**15-1) for _ in range(len(df))]  # random IDs
+df_fixed["last_update"] = np.full(len(df), int(time.time()), dtype=np.int64)  # fake timestamp
+rng = np.random.default_rng()
+df_fixed["channel_id"] = rng.integers(10**14, 10**15, size=len(df), dtype=np.int64)  # random IDs
 df_fixed["capacity"] = df["capacity"]
 
 # Convert enabled/disabled
@@ -10,10 +10,17 @@ Output:
 Usage:
  python3 scripts/hyperjson_split_and_export.py --hyper runs/nch_1_hyper.json --out_prefix runs/nch_1 --threshold 500 --verbose
 """
-import argparse, json, os
+import argparse, ast, os
+import orjson
 import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from caps_soa import node_caps_to_soa, caps_slices, caps_for_hyperedge
 
 def parse_node_caps(raw):
+    # canonical key format is "node|idx"; tuple-repr keys from old dumps are
+    # parsed with ast.literal_eval (never eval untrusted JSON keys)
     node_caps = {}
     for k,v in raw.items():
         if "|" in k:
@@ -21,9 +28,9 @@ def parse_node_caps(raw):
             node_caps[(node, int(idx))] = float(v)
         else:
             try:
-                nk = eval(k)
+                nk = ast.literal_eval(k)
                 node_caps[(nk[0], int(nk[1]))] = float(v)
-            except Exception:
+            except (ValueError, SyntaxError):
                 pass
     return node_caps
 
@@ -32,47 +39,66 @@ def main():
     p.add_argument("--hyper", required=True)
     p.add_argument("--out_prefix", required=True)
     p.add_argument("--threshold", type=int, default=500)
+    p.add_argument("--format", choices=["csv", "parquet"], default="parquet", help="small clique edges output format")
     p.add_argument("--verbose", action="store_true")
     args = p.parse_args()
 
-    j = json.load(open(args.hyper))
+    j = orjson.loads(open(args.hyper, 'rb').read())
     hyperedges = j.get("hyperedges", [])
     node_caps = parse_node_caps(j.get("node_caps", {}))
+    # group node_caps once (SoA sorted by hyperedge) so each hyperedge's caps
+    # come from a contiguous slice instead of tuple-keyed dict lookups
+    cap_nodes, cap_idxs, cap_vals = node_caps_to_soa(node_caps)
+    splits = caps_slices(cap_idxs, len(hyperedges))
 
-    small_rows = []
+    # per-column lists instead of a list of row dicts: one block per dtype in
+    # the final table, no per-row dict allocation
+    small_src, small_trg, small_cap = [], [], []
     big_hyperedges = []
     big_node_caps = {}
 
     skipped = 0
     for idx, hed in enumerate(hyperedges):
         k = len(hed)
+        cap_of = caps_for_hyperedge(cap_nodes, cap_vals, splits, idx)
         if k <= args.threshold:
             # convert to clique rows
             for u in hed:
-                cap_u = node_caps.get((u, idx), 1.0)
-                # base_fee & fee_rate defaults (adjust if you need)
-                base_fee = 100.0
-                fee_rate = 1.0
+                cap_u = cap_of.get(u, 1.0)
                 for v in hed:
                     if u == v: continue
-                    small_rows.append({
-                        "src": u, "trg": v, "capacity": cap_u,
-                        "base_fee": base_fee, "fee_rate": fee_rate, "enabled": True
-                    })
+                    small_src.append(u)
+                    small_trg.append(v)
+                    small_cap.append(cap_u)
         else:
             # keep hyperedge and its node_caps
             big_hyperedges.append(hed)
             for u in hed:
-                if (u, idx) in node_caps:
-                    big_node_caps[(u, len(big_hyperedges)-1)] = node_caps[(u, idx)]
+                if u in cap_of:
+                    big_node_caps[(u, len(big_hyperedges)-1)] = cap_of[u]
             skipped += 1
 
-    # write small clique CSV if any
-    small_csv = f"{args.out_prefix}_small_edges.csv"
-    if small_rows:
-        pd.DataFrame(small_rows).to_csv(small_csv, index=False)
+    # write small clique edges if any
+    n_small = len(small_src)
+    if n_small:
+        # base_fee & fee_rate defaults (adjust if you need)
+        columns = {"src": np.asarray(small_src, dtype=object),
+                   "trg": np.asarray(small_trg, dtype=object),
+                   "capacity": np.asarray(small_cap, dtype=np.float64),
+                   "base_fee": np.full(n_small, 100.0),
+                   "fee_rate": np.full(n_small, 1.0),
+                   "enabled": np.ones(n_small, dtype=bool)}
+        if args.format == "parquet":
+            small_path = f"{args.out_prefix}_small_edges.parquet"
+            # dictionary encoding shrinks the heavily repeated src/trg node IDs
+            pq.write_table(pa.table({k: pa.array(v.tolist()) if v.dtype == object else pa.array(v)
+                                     for k, v in columns.items()}),
+                           small_path, compression='zstd', use_dictionary=True)
+        else:
+            small_path = f"{args.out_prefix}_small_edges.csv"
+            pd.DataFrame(columns).to_csv(small_path, index=False)
         if args.verbose:
-            print("Wrote small clique CSV:", small_csv, "rows:", len(small_rows))
+            print("Wrote small clique edges (%s):" % args.format, small_path, "rows:", n_small)
     else:
         print("No small hyperedges to convert (all were > threshold).")
 
@@ -85,14 +111,14 @@ def main():
             # idx now corresponds to position in big_hyperedges
             node_caps_serial[f"{n}|{idx}"] = cap
         j2 = {"hyperedges": [list(h) for h in big_hyperedges], "node_caps": node_caps_serial}
-        json.dump(j2, open(big_hyperjson, "w"))
+        open(big_hyperjson, "wb").write(orjson.dumps(j2))
         if args.verbose:
             sizes = [len(h) for h in big_hyperedges]
             print("Wrote big hyperjson:", big_hyperjson, "big_count:", len(big_hyperedges), "max_size:", max(sizes))
     else:
         print("No big hyperedges; big hyperjson not written.")
 
-    print("Summary: hyperedges_total=%d small_converted=%d big_skipped=%d" % (len(hyperedges), len(small_rows)>0 and len(set(tuple(r.items()) for r in small_rows)) or 0, skipped))
+    print("Summary: hyperedges_total=%d small_converted=%d big_skipped=%d" % (len(hyperedges), n_small, skipped))
 
 if __name__ == '__main__':
     main()
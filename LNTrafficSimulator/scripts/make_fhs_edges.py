@@ -22,12 +22,22 @@ Options:
 """
 
 import os
-import json
+import csv
+import orjson
 import argparse
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+try:
+    from numba import njit
+except ImportError:
+    njit = None
 from topologies.fhs import create_fhs
 from topologies.utils import edges_df_to_nx
+from caps_soa import node_caps_to_soa, caps_slices, caps_for_hyperedge
 
 def detect_endpoint_cols(df: pd.DataFrame):
     cols = list(df.columns)
@@ -44,48 +54,151 @@ def detect_endpoint_cols(df: pd.DataFrame):
         return cols[1], cols[2]
     raise RuntimeError("Cannot detect endpoint columns in ln_edges.csv; columns: %s" % cols)
 
+if njit is not None:
+    @njit(cache=True)
+    def _accumulate_totals(src, trg, caps, n_nodes):
+        out = np.zeros(n_nodes, dtype=np.float64)
+        for i in range(src.size):
+            out[src[i]] += caps[i]
+            out[trg[i]] += caps[i]
+        return out
+
 def compute_node_totals(edges_df, src_col, trg_col, cap_col='capacity'):
-    node_totals = defaultdict(float)
     if cap_col not in edges_df.columns:
         # maybe capacity is named differently
         raise RuntimeError("capacity column not found in edges dataframe")
-    for _, r in edges_df.iterrows():
-        u = r[src_col]
-        v = r[trg_col]
-        try:
-            cap = float(r[cap_col])
-        except Exception:
-            cap = 0.0
-        node_totals[u] += cap
-        node_totals[v] += cap
-    return dict(node_totals)
-
-def export_hyperjson(hyperedges, node_caps, out_path):
-    # normalize node_caps keys as "node|idx" strings for portability
-    node_caps_serial = { f"{k[0]}|{k[1]}": v for k,v in node_caps.items() }
-    j = {"hyperedges":[list(h) for h in hyperedges], "node_caps": node_caps_serial}
-    with open(out_path, "w") as fh:
-        json.dump(j, fh)
+    cap = pd.to_numeric(edges_df[cap_col], errors='coerce').fillna(0.0)
+    src = edges_df[src_col].to_numpy()
+    trg = edges_df[trg_col].to_numpy()
+    if njit is not None and src.dtype.kind in 'iu' and trg.dtype.kind in 'iu' and len(src):
+        # integer-coded endpoints: a jitted scatter-add beats even groupby
+        # because it skips the hash-group machinery entirely
+        n_nodes = int(max(src.max(), trg.max())) + 1
+        out = _accumulate_totals(src, trg, cap.to_numpy(dtype=np.float64), n_nodes)
+        return dict(enumerate(out.tolist()))
+    # vectorized groupby-sum per endpoint instead of a per-row Python loop
+    s = cap.groupby(edges_df[src_col], sort=False).sum()
+    t = cap.groupby(edges_df[trg_col], sort=False).sum()
+    return s.add(t, fill_value=0.0).to_dict()
+
+def export_hyperjson(hyperedges, node_caps, out_path, id_to_node=None):
+    # normalize node_caps keys as "node|idx" strings for portability;
+    # id_to_node maps int node codes back to original IDs at the last moment.
+    # The file is streamed element by element so the serialized hyperedges and
+    # node_caps never exist as one in-memory structure.
+    with open(out_path, "wb") as fh:
+        fh.write(b'{"hyperedges":[')
+        for i, h in enumerate(hyperedges):
+            if i:
+                fh.write(b",")
+            members = [id_to_node[n] for n in h] if id_to_node is not None else list(h)
+            fh.write(orjson.dumps(members))
+        fh.write(b'],"node_caps":{')
+        first = True
+        for (n, idx), cap in node_caps.items():
+            if not first:
+                fh.write(b",")
+            first = False
+            node = id_to_node[n] if id_to_node is not None else n
+            fh.write(orjson.dumps(f"{node}|{idx}"))
+            fh.write(b":")
+            fh.write(orjson.dumps(cap))
+        fh.write(b"}}")
     return out_path
 
-def export_clique_edges_csv(hyperedges, node_caps, out_path, warn_threshold=500):
+def _expand(task):
+    # per-hyperedge vectorized clique expansion; top-level so it pickles for the pool
+    nodes, caps = task
+    k = len(nodes)
+    nodes = np.asarray(nodes, dtype=object)
+    caps_vec = np.asarray(caps, dtype=np.float64)
+    ii, jj = np.meshgrid(np.arange(k), np.arange(k), indexing='ij')
+    mask = ii != jj
+    # row u repeats its capacity for all k-1 partners
+    return nodes[ii[mask]], nodes[jj[mask]], np.repeat(caps_vec, k - 1)
+
+_CLIQUE_SCHEMA = pa.schema([('src', pa.string()), ('trg', pa.string()),
+                            ('capacity', pa.float64()), ('base_fee', pa.float64()),
+                            ('fee_rate', pa.float64()), ('enabled', pa.bool_())])
+
+def export_clique_edges_csv(hyperedges, node_caps, out_path, warn_threshold=500, jobs=1, fmt='csv', id_to_node=None):
     # refuse to create clique if any hyperedge is larger than warn_threshold unless user overrides
     sizes = [len(h) for h in hyperedges]
     if sizes and max(sizes) > warn_threshold:
         raise RuntimeError("Refusing to export clique: hyperedge max size %d > warn_threshold %d" % (max(sizes), warn_threshold))
-    rows = []
+    # stream each hyperedge's vectorized expansion straight to the CSV so peak
+    # memory stays O(k^2) per hyperedge instead of O(total rows)
+    # group node_caps once (SoA sorted by hyperedge) so each hyperedge's caps
+    # come from a contiguous slice instead of k tuple-keyed dict lookups
+    cap_nodes, cap_idxs, cap_vals = node_caps_to_soa(node_caps)
+    splits = caps_slices(cap_idxs, len(hyperedges))
+    tasks = []
     for idx, hed in enumerate(hyperedges):
-        for u in hed:
-            cap = node_caps.get((u, idx), None)
-            if cap is None:
-                cap = 1.0
-            for v in hed:
-                if u == v:
-                    continue
-                rows.append({'src': u, 'trg': v, 'capacity': cap, 'base_fee': 100, 'fee_rate': 1, 'enabled': True})
-    df = pd.DataFrame(rows)
-    df.to_csv(out_path, index=False)
-    return out_path, len(rows)
+        if len(hed) < 2:
+            continue
+        nodes = list(hed)
+        cap_of = caps_for_hyperedge(cap_nodes, cap_vals, splits, idx)
+        caps = [cap_of.get(u, 1.0) for u in nodes]
+        if id_to_node is not None:
+            # translate int codes back to original node IDs only at export time
+            nodes = [id_to_node[u] for u in nodes]
+        tasks.append((nodes, caps))
+    if jobs and jobs > 1:
+        # expansions are independent, fan hyperedges across worker processes
+        ex = ProcessPoolExecutor(max_workers=jobs)
+        expanded = ex.map(_expand, tasks, chunksize=64)
+    else:
+        ex = None
+        expanded = map(_expand, tasks)
+    n_rows = 0
+    if fmt == 'parquet':
+        # dictionary encoding shrinks the heavily repeated src/trg node IDs
+        with pq.ParquetWriter(out_path, _CLIQUE_SCHEMA, compression='zstd', use_dictionary=True) as writer:
+            for src, trg, cap in expanded:
+                n = len(src)
+                batch = pa.record_batch([pa.array(src.tolist(), pa.string()),
+                                         pa.array(trg.tolist(), pa.string()),
+                                         pa.array(cap), pa.array(np.full(n, 100.0)),
+                                         pa.array(np.full(n, 1.0)),
+                                         pa.array(np.ones(n, dtype=bool))], schema=_CLIQUE_SCHEMA)
+                writer.write_batch(batch)
+                n_rows += n
+    else:
+        with open(out_path, "w", newline="") as fh:
+            writer = csv.writer(fh)
+            writer.writerow(['src', 'trg', 'capacity', 'base_fee', 'fee_rate', 'enabled'])
+            for src, trg, cap in expanded:
+                writer.writerows(zip(src.tolist(), trg.tolist(), cap.tolist(),
+                                     [100] * len(src), [1] * len(src), [True] * len(src)))
+                n_rows += len(src)
+    if ex is not None:
+        ex.shutdown()
+    return out_path, n_rows
+
+def hyperedge_size_stats(hyperedges):
+    """(count, min, max, median, mean) of hyperedge sizes in one pass over an int array."""
+    sizes = np.fromiter((len(h) for h in hyperedges), dtype=np.int32, count=len(hyperedges))
+    # np.partition is O(n) quickselect - no full sort just to read the median
+    med = int(np.partition(sizes, sizes.size // 2)[sizes.size // 2])
+    return sizes.size, int(sizes.min()), int(sizes.max()), med, float(sizes.mean())
+
+def dedup_hyperedges(hyperedges, node_to_hyperedges, node_caps):
+    # collapse duplicate hyperedges before any O(k^2) expansion work is spent
+    # on them; indices in node_to_hyperedges/node_caps are remapped, capacities
+    # of merged duplicates are summed so node totals are preserved
+    unique = {}
+    remap = {}
+    for old_idx, h in enumerate(hyperedges):
+        fs = frozenset(h)
+        new_idx = unique.setdefault(fs, len(unique))
+        remap[old_idx] = new_idx
+    if len(unique) == len(hyperedges):
+        return hyperedges, node_to_hyperedges, node_caps
+    node_to_hyperedges = {n: sorted({remap[i] for i in idxs}) for n, idxs in node_to_hyperedges.items()}
+    merged_caps = defaultdict(float)
+    for (n, i), cap in node_caps.items():
+        merged_caps[(n, remap[i])] += cap
+    return list(unique), node_to_hyperedges, dict(merged_caps)
 
 def main():
     p = argparse.ArgumentParser()
@@ -95,6 +208,8 @@ def main():
     p.add_argument("--use_edge_capacity", action="store_true", default=True, help="compute node deposits from original capacities")
     p.add_argument("--to_clique", action="store_true", help="also export clique-style edges CSV (may be huge)")
     p.add_argument("--max_clique_size", type=int, default=500, help="max hyperedge size allowed to export clique")
+    p.add_argument("--jobs", type=int, default=1, help="worker processes for clique expansion (1 = sequential)")
+    p.add_argument("--format", choices=["csv", "parquet"], default="parquet", help="clique edges output format")
     p.add_argument("--verbose", action="store_true", help="verbose output")
     args = p.parse_args()
 
@@ -102,18 +217,28 @@ def main():
     if not os.path.exists(ln_path):
         raise SystemExit("ln_edges.csv not found at %s" % ln_path)
 
-    df = pd.read_csv(ln_path)
+    # sniff the header cheaply, then load only the needed columns with the
+    # multithreaded pyarrow CSV engine
+    header = pd.read_csv(ln_path, nrows=0)
+    src_col, trg_col = detect_endpoint_cols(header)
+    want = [c for c in (src_col, trg_col, 'capacity') if c in header.columns]
+    df = pd.read_csv(ln_path, usecols=want, engine='pyarrow')
     if args.verbose:
         print("Loaded ln_edges:", ln_path, "shape:", df.shape)
+        print("Detected endpoint columns:", src_col, trg_col)
 
-    # detect endpoint columns robustly
-    src_col, trg_col = detect_endpoint_cols(df)
+    # intern node-ID strings (LN pubkeys) to dense int32 codes once; all
+    # downstream hashing/lookup is on small ints, strings only reappear at export
+    cat = pd.Categorical(pd.concat([df[src_col], df[trg_col]], ignore_index=True))
+    id_to_node = np.asarray(cat.categories)
+    codes = np.asarray(cat.codes, dtype=np.int32)
+    tmp = pd.DataFrame({'src': codes[:len(df)], 'trg': codes[len(df):]})
+    if 'capacity' in df.columns:
+        tmp['capacity'] = df['capacity'].to_numpy()
     if args.verbose:
-        print("Detected endpoint columns:", src_col, trg_col)
+        print("Interned %d unique node IDs to int32 codes" % len(id_to_node))
 
-    # build undirected networkx graph for topology grouping
-    # edges_df_to_nx expects 'src','trg' column names, so rename temporarily
-    tmp = df.rename(columns={src_col:'src', trg_col:'trg'})
+    # build undirected networkx graph (on int codes) for topology grouping
     G = edges_df_to_nx(tmp)
     if args.verbose:
         print("Constructed NX graph nodes/edges:", G.number_of_nodes(), G.number_of_edges())
@@ -121,11 +246,12 @@ def main():
     # create FHS hyperedges
     hyperedges, node_to_hyperedges, node_caps = create_fhs(G, args.m_max, use_edge_capacity=False)
     # create_fhs returns node_caps if use_edge_capacity True; we passed False for now
+    hyperedges, node_to_hyperedges, node_caps = dedup_hyperedges(hyperedges, node_to_hyperedges, node_caps)
     if args.verbose:
-        sizes = [len(h) for h in hyperedges]
         print("FHS created hyperedges:", len(hyperedges))
-        if sizes:
-            print("size stats: max=%d median=%d mean=%.1f" % (max(sizes), sorted(sizes)[len(sizes)//2], sum(sizes)/len(sizes)))
+        if hyperedges:
+            _, _, mx, med, mean = hyperedge_size_stats(hyperedges)
+            print("size stats: max=%d median=%d mean=%.1f" % (mx, med, mean))
 
     # Compute node_caps using original capacities if requested
     if args.use_edge_capacity:
@@ -134,18 +260,19 @@ def main():
         else:
             if args.verbose:
                 print("Computing node total capacities from ln_edges.csv and splitting across hyperedges")
-            node_totals = compute_node_totals(df, src_col, trg_col, cap_col='capacity')
-            node_caps = {}
-            for node, hed_idxs in node_to_hyperedges.items():
-                if not hed_idxs:
-                    continue
-                total = node_totals.get(node, 0.0)
-                # Avoid zero total: if zero, assign small positive deposit so hyperedge exists
-                if total <= 0.0:
-                    total = 1.0
-                per = total / len(hed_idxs)
-                for idx in hed_idxs:
-                    node_caps[(node, idx)] = float(per)
+            node_totals = compute_node_totals(tmp, 'src', 'trg', cap_col='capacity')
+            # vectorized split: flatten node_to_hyperedges into parallel arrays,
+            # do the per-node division once in numpy, then build the dict in one pass
+            nodes = [n for n, idxs in node_to_hyperedges.items() if idxs]
+            counts = np.fromiter((len(node_to_hyperedges[n]) for n in nodes), dtype=np.int64, count=len(nodes))
+            totals = np.fromiter((node_totals.get(n, 0.0) for n in nodes), dtype=np.float64, count=len(nodes))
+            # Avoid zero total: if zero, assign small positive deposit so hyperedge exists
+            totals[totals <= 0.0] = 1.0
+            flat_per = np.repeat(totals / counts, counts)
+            flat_nodes = np.repeat(np.asarray(nodes), counts)
+            flat_idxs = np.fromiter((i for n in nodes for i in node_to_hyperedges[n]),
+                                    dtype=np.int64, count=int(counts.sum()))
+            node_caps = dict(zip(zip(flat_nodes.tolist(), flat_idxs.tolist()), flat_per.tolist()))
             if args.verbose:
                 print("Computed node_caps entries:", len(node_caps))
 
@@ -156,23 +283,22 @@ def main():
         os.makedirs(out_dir, exist_ok=True)
 
     hyperjson_path = f"{out_prefix}_hyper.json"
-    export_hyperjson(hyperedges, node_caps, hyperjson_path)
+    export_hyperjson(hyperedges, node_caps, hyperjson_path, id_to_node=id_to_node)
     print("Wrote hyperjson:", hyperjson_path, "  hyperedges:", len(hyperedges))
 
     # print some hyperedge size histogram info
     if hyperedges:
-        sizes = [len(h) for h in hyperedges]
         print("Hyperedge size stats: count=%d min=%d max=%d median=%d mean=%.2f" %
-              (len(sizes), min(sizes), max(sizes), sorted(sizes)[len(sizes)//2], sum(sizes)/len(sizes)))
+              hyperedge_size_stats(hyperedges))
 
     # Optionally export clique edges CSV (Approach A)
     if args.to_clique:
         max_size = max([len(h) for h in hyperedges]) if hyperedges else 0
         if max_size > args.max_clique_size:
             raise SystemExit("Refusing to export clique: max hyperedge size %d > max_clique_size %d. Use smaller m_max or skip clique export." % (max_size, args.max_clique_size))
-        edges_csv_path = f"{out_prefix}_edges.csv"
-        path, rows = export_clique_edges_csv(hyperedges, node_caps, edges_csv_path, warn_threshold=args.max_clique_size)
-        print("Wrote clique edges CSV:", path, "rows:", rows)
+        edges_path = f"{out_prefix}_edges.%s" % ("parquet" if args.format == "parquet" else "csv")
+        path, rows = export_clique_edges_csv(hyperedges, node_caps, edges_path, warn_threshold=args.max_clique_size, jobs=args.jobs, fmt=args.format, id_to_node=id_to_node)
+        print("Wrote clique edges (%s):" % args.format, path, "rows:", rows)
 
     print("Done.")
 
@@ -11,11 +11,20 @@ Outputs:
   <out_prefix>_hyper.json
   <out_prefix>_edges.csv  (only if --to_clique)
 """
-import os, json, argparse
+import os, csv, orjson, argparse
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+try:
+    from numba import njit
+except ImportError:
+    njit = None
 from topologies.nch import create_nch
 from topologies.utils import edges_df_to_nx
+from caps_soa import node_caps_to_soa, caps_slices, caps_for_hyperedge
 
 def detect_endpoint_cols(df):
     cols = list(df.columns)
@@ -26,41 +35,142 @@ def detect_endpoint_cols(df):
     # fallback
     return cols[1], cols[2]
 
+if njit is not None:
+    @njit(cache=True)
+    def _accumulate_totals(src, trg, caps, n_nodes):
+        out = np.zeros(n_nodes, dtype=np.float64)
+        for i in range(src.size):
+            out[src[i]] += caps[i]
+            out[trg[i]] += caps[i]
+        return out
+
 def compute_node_totals(df, src_col, trg_col, cap_col='capacity'):
-    totals = defaultdict(float)
     if cap_col not in df.columns:
         return {}
-    for _, r in df.iterrows():
-        try:
-            c = float(r.get(cap_col, 0.0))
-        except Exception:
-            c = 0.0
-        totals[r[src_col]] += c
-        totals[r[trg_col]] += c
-    return dict(totals)
-
-def export_hyperjson(hyperedges, node_caps, path):
-    node_caps_serial = { f"{k[0]}|{k[1]}": v for k,v in node_caps.items() }
-    j = {"hyperedges":[list(h) for h in hyperedges], "node_caps": node_caps_serial}
-    with open(path, "w") as fh:
-        json.dump(j, fh)
+    cap = pd.to_numeric(df[cap_col], errors='coerce').fillna(0.0)
+    src = df[src_col].to_numpy()
+    trg = df[trg_col].to_numpy()
+    if njit is not None and src.dtype.kind in 'iu' and trg.dtype.kind in 'iu' and len(src):
+        # integer-coded endpoints: a jitted scatter-add beats even groupby
+        # because it skips the hash-group machinery entirely
+        n_nodes = int(max(src.max(), trg.max())) + 1
+        out = _accumulate_totals(src, trg, cap.to_numpy(dtype=np.float64), n_nodes)
+        return dict(enumerate(out.tolist()))
+    # vectorized groupby-sum per endpoint instead of a per-row Python loop
+    s = cap.groupby(df[src_col], sort=False).sum()
+    t = cap.groupby(df[trg_col], sort=False).sum()
+    return s.add(t, fill_value=0.0).to_dict()
+
+def export_hyperjson(hyperedges, node_caps, path, id_to_node=None):
+    # id_to_node maps int node codes back to original IDs at the last moment.
+    # Stream the file element by element so the serialized hyperedges and
+    # node_caps never exist as one in-memory structure.
+    with open(path, "wb") as fh:
+        fh.write(b'{"hyperedges":[')
+        for i, h in enumerate(hyperedges):
+            if i:
+                fh.write(b",")
+            members = [id_to_node[n] for n in h] if id_to_node is not None else list(h)
+            fh.write(orjson.dumps(members))
+        fh.write(b'],"node_caps":{')
+        first = True
+        for (n, idx), cap in node_caps.items():
+            if not first:
+                fh.write(b",")
+            first = False
+            node = id_to_node[n] if id_to_node is not None else n
+            fh.write(orjson.dumps(f"{node}|{idx}"))
+            fh.write(b":")
+            fh.write(orjson.dumps(cap))
+        fh.write(b"}}")
     return path
 
-def export_clique(hyperedges, node_caps, out_csv, max_clique_size, fee_profile=None):
-    rows=[]
+def _expand(task):
+    # per-hyperedge vectorized clique expansion; top-level so it pickles for the pool
+    nodes, caps, fees = task
+    k = len(nodes)
+    nodes = np.asarray(nodes, dtype=object)
+    caps_vec = np.asarray(caps, dtype=np.float64)
+    fees_vec = np.asarray(fees, dtype=np.float64)
+    ii, jj = np.meshgrid(np.arange(k), np.arange(k), indexing='ij')
+    mask = ii != jj
+    # row u repeats its capacity/fee for all k-1 partners
+    return nodes[ii[mask]], nodes[jj[mask]], np.repeat(caps_vec, k - 1), np.repeat(fees_vec, k - 1)
+
+_CLIQUE_SCHEMA = pa.schema([('src', pa.string()), ('trg', pa.string()),
+                            ('capacity', pa.float64()), ('base_fee', pa.float64()),
+                            ('fee_rate', pa.float64()), ('enabled', pa.bool_())])
+
+def export_clique(hyperedges, node_caps, out_csv, max_clique_size, fee_profile=None, jobs=1, fmt='csv', id_to_node=None):
     sizes=[len(h) for h in hyperedges]
     if sizes and max(sizes) > max_clique_size:
         raise RuntimeError("Refusing to export clique: max hyperedge size %d > %d" % (max(sizes), max_clique_size))
+    # group node_caps once (SoA sorted by hyperedge) so each hyperedge's caps
+    # come from a contiguous slice instead of k tuple-keyed dict lookups
+    cap_nodes, cap_idxs, cap_vals = node_caps_to_soa(node_caps)
+    splits = caps_slices(cap_idxs, len(hyperedges))
+    tasks=[]
     for idx, hed in enumerate(hyperedges):
-        for u in hed:
-            cap_u = node_caps.get((u, idx), 1.0)
-            base_fee = fee_profile.get(u, 100.0) if fee_profile else 100.0
-            fee_rate = 1.0
-            for v in hed:
-                if u==v: continue
-                rows.append({'src':u,'trg':v,'capacity':cap_u,'base_fee':base_fee,'fee_rate':fee_rate,'enabled':True})
-    pd.DataFrame(rows).to_csv(out_csv, index=False)
-    return out_csv, len(rows)
+        if len(hed) < 2: continue
+        nodes = list(hed)
+        cap_of = caps_for_hyperedge(cap_nodes, cap_vals, splits, idx)
+        caps = [cap_of.get(u, 1.0) for u in nodes]
+        fees = [fee_profile.get(u, 100.0) for u in nodes] if fee_profile else [100.0]*len(nodes)
+        if id_to_node is not None:
+            # translate int codes back to original node IDs only at export time
+            nodes = [id_to_node[u] for u in nodes]
+        tasks.append((nodes, caps, fees))
+    # stream each hyperedge's vectorized expansion straight to the output so
+    # peak memory stays O(k^2) per hyperedge instead of O(total rows)
+    if jobs and jobs > 1:
+        # expansions are independent, fan hyperedges across worker processes
+        ex = ProcessPoolExecutor(max_workers=jobs)
+        expanded = ex.map(_expand, tasks, chunksize=64)
+    else:
+        ex = None
+        expanded = map(_expand, tasks)
+    n_rows = 0
+    if fmt == 'parquet':
+        # dictionary encoding shrinks the heavily repeated src/trg node IDs
+        with pq.ParquetWriter(out_csv, _CLIQUE_SCHEMA, compression='zstd', use_dictionary=True) as writer:
+            for src, trg, cap, fee in expanded:
+                n = len(src)
+                batch = pa.record_batch([pa.array(src.tolist(), pa.string()),
+                                         pa.array(trg.tolist(), pa.string()),
+                                         pa.array(cap), pa.array(fee),
+                                         pa.array(np.full(n, 1.0)),
+                                         pa.array(np.ones(n, dtype=bool))], schema=_CLIQUE_SCHEMA)
+                writer.write_batch(batch)
+                n_rows += n
+    else:
+        with open(out_csv, "w", newline="") as fh:
+            writer = csv.writer(fh)
+            writer.writerow(['src','trg','capacity','base_fee','fee_rate','enabled'])
+            for src, trg, cap, fee in expanded:
+                writer.writerows(zip(src.tolist(), trg.tolist(), cap.tolist(),
+                                     fee.tolist(), [1.0]*len(src), [True]*len(src)))
+                n_rows += len(src)
+    if ex is not None:
+        ex.shutdown()
+    return out_csv, n_rows
+
+def dedup_hyperedges(hyperedges, node_to_hyperedges, node_caps):
+    # collapse duplicate hyperedges before any O(k^2) expansion work is spent
+    # on them; indices in node_to_hyperedges/node_caps are remapped, capacities
+    # of merged duplicates are summed so node totals are preserved
+    unique = {}
+    remap = {}
+    for old_idx, h in enumerate(hyperedges):
+        fs = frozenset(h)
+        new_idx = unique.setdefault(fs, len(unique))
+        remap[old_idx] = new_idx
+    if len(unique) == len(hyperedges):
+        return hyperedges, node_to_hyperedges, node_caps
+    node_to_hyperedges = {n: sorted({remap[i] for i in idxs}) for n, idxs in node_to_hyperedges.items()}
+    merged_caps = defaultdict(float)
+    for (n, i), cap in node_caps.items():
+        merged_caps[(n, remap[i])] += cap
+    return list(unique), node_to_hyperedges, dict(merged_caps)
 
 def main():
     p=argparse.ArgumentParser()
@@ -70,63 +180,76 @@ def main():
     p.add_argument("--use_edge_capacity", action="store_true", help="split node totals across hyperedges")
     p.add_argument("--to_clique", action="store_true")
     p.add_argument("--max_clique_size", type=int, default=500)
+    p.add_argument("--jobs", type=int, default=1, help="worker processes for clique expansion (1 = sequential)")
+    p.add_argument("--format", choices=["csv", "parquet"], default="parquet", help="clique edges output format")
     p.add_argument("--verbose", action="store_true")
     args=p.parse_args()
 
     if not os.path.exists(args.ln_edges):
         raise SystemExit("ln_edges not found: %s" % args.ln_edges)
-    df=pd.read_csv(args.ln_edges)
-    src_col, trg_col = detect_endpoint_cols(df)
-    tmp=df.rename(columns={src_col:'src', trg_col:'trg'})
+    # sniff the header cheaply, then load only the needed columns with the
+    # multithreaded pyarrow CSV engine
+    header = pd.read_csv(args.ln_edges, nrows=0)
+    src_col, trg_col = detect_endpoint_cols(header)
+    want = [c for c in (src_col, trg_col, 'capacity', 'fee_base_msat', 'base_fee') if c in header.columns]
+    df = pd.read_csv(args.ln_edges, usecols=want, engine='pyarrow')
+    # intern node-ID strings (LN pubkeys) to dense int32 codes once; all
+    # downstream hashing/lookup is on small ints, strings only reappear at export
+    cat = pd.Categorical(pd.concat([df[src_col], df[trg_col]], ignore_index=True))
+    id_to_node = np.asarray(cat.categories)
+    codes = np.asarray(cat.codes, dtype=np.int32)
+    tmp = pd.DataFrame({'src': codes[:len(df)], 'trg': codes[len(df):]})
+    if 'capacity' in df.columns:
+        tmp['capacity'] = df['capacity'].to_numpy()
     G=edges_df_to_nx(tmp)
     if args.verbose:
         print("Graph nodes/edges:", G.number_of_nodes(), G.number_of_edges())
 
     hyperedges, node_to_hyperedges, node_caps = create_nch(G, max_cover_size=args.max_cover_size, use_edge_capacity=False)
+    hyperedges, node_to_hyperedges, node_caps = dedup_hyperedges(hyperedges, node_to_hyperedges, node_caps)
     if args.verbose:
         sizes=[len(h) for h in hyperedges]
         print("Hyperedges:", len(hyperedges), "max:", max(sizes) if sizes else 0)
 
     # compute node_caps from original capacities if requested
     if args.use_edge_capacity and 'capacity' in df.columns:
-        node_totals = compute_node_totals(df, src_col, trg_col, cap_col='capacity')
-        node_caps = {}
-        for node, hed_idxs in node_to_hyperedges.items():
-            if not hed_idxs: continue
-            total=node_totals.get(node, 0.0) or 1.0
-            per = float(total)/len(hed_idxs)
-            for idx in hed_idxs:
-                node_caps[(node, idx)] = per
+        node_totals = compute_node_totals(tmp, 'src', 'trg', cap_col='capacity')
+        # vectorized split: flatten node_to_hyperedges into parallel arrays,
+        # do the per-node division once in numpy, then build the dict in one pass
+        nodes = [n for n, idxs in node_to_hyperedges.items() if idxs]
+        counts = np.fromiter((len(node_to_hyperedges[n]) for n in nodes), dtype=np.int64, count=len(nodes))
+        totals = np.fromiter((node_totals.get(n, 0.0) or 1.0 for n in nodes), dtype=np.float64, count=len(nodes))
+        flat_per = np.repeat(totals / counts, counts)
+        flat_nodes = np.repeat(np.asarray(nodes), counts)
+        flat_idxs = np.fromiter((i for n in nodes for i in node_to_hyperedges[n]),
+                                dtype=np.int64, count=int(counts.sum()))
+        node_caps = dict(zip(zip(flat_nodes.tolist(), flat_idxs.tolist()), flat_per.tolist()))
         if args.verbose:
             print("Computed node_caps entries:", len(node_caps))
 
     out_prefix=args.out_prefix
     os.makedirs(os.path.dirname(out_prefix) or ".", exist_ok=True)
     hyperjson_path = f"{out_prefix}_hyper.json"
-    export_hyperjson(hyperedges, node_caps, hyperjson_path)
+    export_hyperjson(hyperedges, node_caps, hyperjson_path, id_to_node=id_to_node)
     print("Wrote:", hyperjson_path)
 
     if args.to_clique:
         # optional fee profile: reuse fee_base_msat if available
         fee_profile={}
-        for col in ['fee_base_msat','base_fee','fee_base_msat']:
+        for col in ['fee_base_msat','base_fee']:
             if col in df.columns:
-                # build per-node mean
-                profile={}
-                counts={}
-                for _,r in df.iterrows():
-                    u=r[src_col]; v=r[trg_col]
-                    try:
-                        fee=float(r[col])
-                    except:
-                        fee=0.0
-                    profile[u]=profile.get(u,0.0)+fee; counts[u]=counts.get(u,0)+1
-                    profile[v]=profile.get(v,0.0)+fee; counts[v]=counts.get(v,0)+1
-                fee_profile={n:(profile[n]/counts[n] if counts[n]>0 else 100.0) for n in profile}
+                # per-node mean fee via vectorized groupby instead of iterrows
+                # keyed on int node codes like the hyperedges
+                fee = pd.to_numeric(df[col], errors='coerce').fillna(0.0)
+                s_sum = fee.groupby(tmp['src'], sort=False).sum()
+                t_sum = fee.groupby(tmp['trg'], sort=False).sum()
+                s_cnt = fee.groupby(tmp['src'], sort=False).count()
+                t_cnt = fee.groupby(tmp['trg'], sort=False).count()
+                fee_profile = (s_sum.add(t_sum, fill_value=0.0) / s_cnt.add(t_cnt, fill_value=0)).fillna(100.0).to_dict()
                 break
-        edges_csv = f"{out_prefix}_edges.csv"
-        path, rows = export_clique(hyperedges, node_caps, edges_csv, args.max_clique_size, fee_profile)
-        print("Wrote clique CSV:", path, "rows:", rows)
+        edges_path = f"{out_prefix}_edges.%s" % ("parquet" if args.format == "parquet" else "csv")
+        path, rows = export_clique(hyperedges, node_caps, edges_path, args.max_clique_size, fee_profile, jobs=args.jobs, fmt=args.format, id_to_node=id_to_node)
+        print("Wrote clique edges (%s):" % args.format, path, "rows:", rows)
 
 if __name__ == "__main__":
     main()
@@ -1,8 +1,9 @@
 #!/usr/bin/env python3
 # scripts/make_supernode_edges_fixed.py
 
-import pandas as pd, json, os, sys
+import pandas as pd, numpy as np, csv, orjson, os, sys
 from topologies.utils import edges_df_to_nx, create_supernode_hyperedges
+from caps_soa import node_caps_to_soa, caps_slices, caps_for_hyperedge
 
 DATA_DIR = "../ln_data"
 BASE_EDGES_CSV = f"{DATA_DIR}/ln_edges.csv"
@@ -15,12 +16,8 @@ print("Loading:", BASE_EDGES_CSV)
 if not os.path.exists(BASE_EDGES_CSV):
     raise SystemExit("Base edges CSV not found at %s" % BASE_EDGES_CSV)
 
-df = pd.read_csv(BASE_EDGES_CSV)
-print("Loaded edges_df shape:", df.shape)
-print("columns:", list(df.columns))
-
-# --- identify endpoint columns robustly ---
-cands = list(df.columns)
+# --- identify endpoint columns robustly from a cheap header-only read ---
+cands = list(pd.read_csv(BASE_EDGES_CSV, nrows=0).columns)
 # common names
 if 'src' in cands and 'trg' in cands:
     src_col, trg_col = 'src', 'trg'
@@ -31,12 +28,21 @@ else:
     src_col, trg_col = cands[1], cands[2]
 print("Using endpoint columns:", src_col, trg_col)
 
+# load only the needed columns with the multithreaded pyarrow CSV engine
+want = [c for c in (src_col, trg_col, 'capacity', 'disabled') if c in cands]
+df = pd.read_csv(BASE_EDGES_CSV, usecols=want, engine='pyarrow')
+print("Loaded edges_df shape:", df.shape)
+print("columns:", list(df.columns))
+
 # --- Option: filter to enabled channels for topology building ---
 # If you want disabled channels included, set include_disabled=True
 include_disabled = False
 if 'disabled' in df.columns and not include_disabled:
     print("Filtering out disabled channels (disabled=True). Before:", len(df))
-    df = df[df['disabled'] != True]
+    # plain ndarray mask + iloc skips the boolean Series machinery and the
+    # full-frame comparison copy
+    mask = ~df['disabled'].to_numpy(dtype=bool)
+    df = df.iloc[mask]
     print("After:", len(df))
 
 # Build graph (only using endpoints), do NOT filter by capacity to create topology
@@ -48,48 +54,77 @@ print("Running supernode selection...")
 hyperedges, node_to_hyperedges, node_caps = create_supernode_hyperedges(G)
 print("Hyperedges count:", len(hyperedges))
 if len(hyperedges) > 0:
-    sizes = [len(h) for h in hyperedges]
-    print("Hyperedge sizes: max", max(sizes), "median", sorted(sizes)[len(sizes)//2])
+    # np.partition is O(n) quickselect - no full sort just to read the median
+    sizes = np.fromiter((len(h) for h in hyperedges), dtype=np.int32, count=len(hyperedges))
+    print("Hyperedge sizes: max", int(sizes.max()), "median",
+          int(np.partition(sizes, sizes.size // 2)[sizes.size // 2]))
 
 # If capacities are present in original df, compute node_caps if empty
 if not node_caps and 'capacity' in df.columns:
     print("Computing realistic node_caps from original capacities.")
-    node_total = {}
-    for _, r in df.iterrows():
-        u, v, cap = r[src_col], r[trg_col], float(r['capacity'])
-        node_total[u] = node_total.get(u, 0.0) + cap
-        node_total[v] = node_total.get(v, 0.0) + cap
-    for v, idxs in node_to_hyperedges.items():
-        if not idxs:
-            continue
-        per = node_total.get(v, 1.0) / len(idxs)
-        for idx in idxs:
-            node_caps[(v, idx)] = per
+    # vectorized groupby-sum per endpoint instead of a per-row Python loop
+    cap = pd.to_numeric(df['capacity'], errors='coerce').fillna(0.0)
+    s = cap.groupby(df[src_col], sort=False).sum()
+    t = cap.groupby(df[trg_col], sort=False).sum()
+    node_total = s.add(t, fill_value=0.0).to_dict()
+    # vectorized split: flatten node_to_hyperedges into parallel arrays, do the
+    # per-node division once in numpy, then build the dict in one pass
+    nodes = [v for v, idxs in node_to_hyperedges.items() if idxs]
+    counts = np.fromiter((len(node_to_hyperedges[v]) for v in nodes), dtype=np.int64, count=len(nodes))
+    totals = np.fromiter((node_total.get(v, 1.0) for v in nodes), dtype=np.float64, count=len(nodes))
+    flat_per = np.repeat(totals / counts, counts)
+    flat_nodes = np.repeat(np.asarray(nodes, dtype=object), counts)
+    flat_idxs = np.fromiter((i for v in nodes for i in node_to_hyperedges[v]),
+                            dtype=np.int64, count=int(counts.sum()))
+    node_caps.update(zip(zip(flat_nodes.tolist(), flat_idxs.tolist()), flat_per.tolist()))
 
-# Save hyperjson (for inspection)
-with open(OUT_HYPERJSON, 'w') as f:
-    j = {'hyperedges':[list(h) for h in hyperedges], 'node_caps': {f"{k[0]}|{k[1]}":v for k,v in node_caps.items()}}
-    json.dump(j, f)
+# Save hyperjson (for inspection); streamed per element so the serialized
+# hyperedges and node_caps never exist as one in-memory structure
+with open(OUT_HYPERJSON, 'wb') as f:
+    f.write(b'{"hyperedges":[')
+    for i, h in enumerate(hyperedges):
+        if i:
+            f.write(b",")
+        f.write(orjson.dumps(list(h)))
+    f.write(b'],"node_caps":{')
+    first = True
+    for (n, idx), cap in node_caps.items():
+        if not first:
+            f.write(b",")
+        first = False
+        f.write(orjson.dumps(f"{n}|{idx}"))
+        f.write(b":")
+        f.write(orjson.dumps(cap))
+    f.write(b"}}")
 print("Wrote hyperjson:", OUT_HYPERJSON)
 
 # Convert hyperedges -> directed clique edges (fallback to original edges if none)
-rows = []
-for idx, hed in enumerate(hyperedges):
-    if not hed: 
-        continue
-    for u in hed:
-        cap = node_caps.get((u, idx), None)
-        if cap is None:
-            cap = 1.0
-        for v in hed:
-            if u == v: 
-                continue
-            rows.append({'src':u, 'trg':v, 'capacity':cap, 'base_fee':100, 'fee_rate':1, 'enabled':True})
+# stream each hyperedge's vectorized expansion straight to the CSV so peak
+# memory stays O(k^2) per hyperedge instead of O(total rows)
+cap_nodes, cap_idxs, cap_vals = node_caps_to_soa(node_caps)
+splits = caps_slices(cap_idxs, len(hyperedges))
+n_rows = 0
+with open(OUT_EDGES_CSV, "w", newline="") as fh:
+    writer = csv.writer(fh)
+    writer.writerow(['src','trg','capacity','base_fee','fee_rate','enabled'])
+    for idx, hed in enumerate(hyperedges):
+        k = len(hed)
+        if k < 2:
+            continue
+        cap_of = caps_for_hyperedge(cap_nodes, cap_vals, splits, idx)
+        nodes = np.asarray(list(hed), dtype=object)
+        # one cap lookup per node; row u repeats its capacity for all k-1 partners
+        caps_vec = np.fromiter((cap_of.get(u, 1.0) for u in nodes), dtype=np.float64, count=k)
+        ii, jj = np.meshgrid(np.arange(k), np.arange(k), indexing='ij')
+        mask = ii != jj
+        src = nodes[ii[mask]]
+        trg = nodes[jj[mask]]
+        writer.writerows(zip(src.tolist(), trg.tolist(), np.repeat(caps_vec, k - 1).tolist(),
+                             [100]*len(src), [1]*len(src), [True]*len(src)))
+        n_rows += len(src)
 
-if rows:
-    out_df = pd.DataFrame(rows)
-    out_df.to_csv(OUT_EDGES_CSV, index=False)
-    print("Wrote supernode edges CSV with %d rows -> %s" % (len(out_df), OUT_EDGES_CSV))
+if n_rows:
+    print("Wrote supernode edges CSV with %d rows -> %s" % (n_rows, OUT_EDGES_CSV))
 else:
     print("No hyperedges generated; falling back to original edges CSV copy.")
     df.rename(columns={src_col:'src', trg_col:'trg'}).to_csv(OUT_EDGES_CSV, index=False)
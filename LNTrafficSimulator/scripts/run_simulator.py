@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 import pandas as pd
-import sys, os, json
+import sys, os, json, glob
+from concurrent.futures import ProcessPoolExecutor
 from lnsimulator.ln_utils import preprocess_json_file
 import lnsimulator.simulator.transaction_simulator as ts
 
@@ -44,6 +45,11 @@ def run_experiment(edges, parameter_file, output_dir, hyperjson=None):
         opt_fees_df.to_csv("%s/opt_fees.csv" % output_dir, index=False)
     print("\ndone")
 
+def _run_one(job):
+    # top-level so it pickles for the process pool
+    edges, parameter_file, output_dir, hyperjson = job
+    run_experiment(edges, parameter_file, output_dir, hyperjson=hyperjson)
+
 if __name__ == "__main__":
     # support optional hyperjson as 5th arg
     if len(sys.argv) >= 5:
@@ -59,7 +65,18 @@ if __name__ == "__main__":
                 directed_edges = pd.read_csv(arg2)
             else:
                 snapshot_id = int(arg2)
-                snapshots = pd.read_csv("%s/ln_edges.csv" % data_dir)
+                # read only the columns the simulator touches, with compact
+                # dtypes (categories for the repeated pub keys), instead of
+                # materializing every column of every snapshot in the file
+                csv_path = "%s/ln_edges.csv" % data_dir
+                present = list(pd.read_csv(csv_path, nrows=0).columns)
+                want = [c for c in ("snapshot_id", "src", "trg", "last_update",
+                                    "capacity", "disabled", "fee_base_msat",
+                                    "fee_rate_milli_msat", "total_fee") if c in present]
+                dtypes = {"snapshot_id": "int32", "src": "category", "trg": "category",
+                          "capacity": "float64"}
+                snapshots = pd.read_csv(csv_path, usecols=want or None,
+                                        dtype={k: v for k, v in dtypes.items() if k in present})
                 directed_edges = snapshots[snapshots["snapshot_id"]==snapshot_id]
         else:
             raise ValueError("The first arguments must be 'raw' or 'preprocessed'!")
@@ -74,9 +91,24 @@ if __name__ == "__main__":
             if not os.path.exists(hyperjson_path):
                 print("Warning: provided hyperjson path does not exist:", hyperjson_path)
 
-        run_experiment(directed_edges, parameter_file, output_folder, hyperjson=hyperjson_path)
+        if os.path.isdir(parameter_file):
+            # parameter sweep: every *.json in the directory is an independent
+            # experiment, so fan them out across processes; each job writes
+            # into its own subfolder of output_folder named after the file
+            param_files = sorted(glob.glob(os.path.join(parameter_file, "*.json")))
+            if not param_files:
+                raise ValueError("No *.json parameter files found in %s" % parameter_file)
+            jobs = [(directed_edges, pf,
+                     os.path.join(output_folder, os.path.splitext(os.path.basename(pf))[0]),
+                     hyperjson_path) for pf in param_files]
+            with ProcessPoolExecutor(max_workers=max_threads) as ex:
+                list(ex.map(_run_one, jobs))
+        else:
+            run_experiment(directed_edges, parameter_file, output_folder, hyperjson=hyperjson_path)
     else:
         print("You must support 4+ input arguments:")
         print("   run_simulator.py raw <json_file_path> <parameter_file> <output_folder> [hyperjson]")
         print("OR")
         print("   run_simulator.py preprocessed <edges_csv_or_snapshot_id> <parameter_file> <output_folder> [hyperjson]")
+        print("<parameter_file> may also be a directory of *.json files; the experiments")
+        print("then run in parallel (max_threads processes), one output subfolder per file.")
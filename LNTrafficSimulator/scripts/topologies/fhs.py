@@ -1,14 +1,23 @@
-import networkx as nx
+import heapq
+import numpy as np
+import pandas as pd
 from collections import deque
 from typing import List, Tuple, Dict, Set
+from .graph import Graph
+from .utils import n2h_to_csr
 
-def highest_degree_node(G: nx.Graph):
-    """Return the node with highest degree. Tie-break deterministically by node id."""
-    # degree view -> list of (node, deg)
-    # Use sorted with reverse degree, then node for deterministic tie-break
-    return max(G.nodes(), key=lambda n: (G.degree(n), -hash(n)))  # hash used to give deterministic-ish order
+def highest_degree_node(G: Graph):
+    """Return the node with highest degree. Ties break on the smaller node id,
+    which is stable across runs (hash() of strings varies with PYTHONHASHSEED)
+    and matches the tie-break of the degree heap in create_fhs."""
+    best = None
+    best_deg = -1
+    for n, d in G.degree():
+        if d > best_deg or (d == best_deg and n < best):
+            best, best_deg = n, d
+    return best
 
-def bfs_collect_m(G: nx.Graph, start_node, m_max: int) -> List:
+def bfs_collect_m(G: Graph, start_node, m_max: int) -> List:
     """
     BFS from start_node collecting at most m_max distinct nodes (including start_node).
     Returns list of nodes in the order visited (root first).
@@ -27,7 +36,29 @@ def bfs_collect_m(G: nx.Graph, start_node, m_max: int) -> List:
                     break
     return collected
 
-def create_fhs(G_input: nx.Graph, m_max: int, use_edge_capacity: bool = True):
+def _bfs_collect_m_flat(adj, start, m_max, visited):
+    """
+    BFS over the int-remapped adjacency collecting at most m_max node ids.
+    The output list doubles as the queue (a head index replaces popleft) and
+    visited is a byte mask indexed by node id, so the hot membership test is
+    a single array read instead of a set hash. Caller owns resetting visited.
+    """
+    out = [start]
+    visited[start] = 1
+    head = 0
+    while head < len(out) and len(out) < m_max:
+        cur = out[head]
+        head += 1
+        for nb in adj[cur]:
+            if not visited[nb]:
+                visited[nb] = 1
+                out.append(nb)
+                if len(out) >= m_max:
+                    break
+    return out
+
+def create_fhs(G_input: Graph, m_max: int, use_edge_capacity: bool = True,
+               edges_df=None):
     """
     Generate Fixed-Hyperedge-Size hypergraph from copy of G_input.
     Returns:
@@ -35,26 +66,55 @@ def create_fhs(G_input: nx.Graph, m_max: int, use_edge_capacity: bool = True):
       - node_to_hyperedges: dict node -> list of hyperedge indices
       - node_capacity_in_hyperedge: dict (node, hedg_idx) -> capacity (float) [optional]
     The algorithm destructively updates a copy of the graph (G_work).
+    If edges_df (the original src/trg/capacity DataFrame) is passed, node
+    capacity totals come from a vectorized groupby over it instead of
+    iterating the graph's edge view in Python.
     """
-    # Work on a copy
-    G = G_input.copy()
+    # remap nodes to 0..N-1 and build a private int adjacency (list of sets):
+    # the whole destructive loop then runs on flat int structures - no graph
+    # copy, int heap entries, and a byte-mask BFS - with original ids only
+    # reappearing in the returned hyperedges
+    node_list = list(G_input.nodes())
+    N = len(node_list)
+    idx_of = {n: i for i, n in enumerate(node_list)}
+    adj = [set() for _ in range(N)]
+    for u, v in G_input.edges():
+        ui, vi = idx_of[u], idx_of[v]
+        adj[ui].add(vi)
+        adj[vi].add(ui)
 
     hyperedges: List[frozenset] = []
-    node_to_hyperedges: Dict = {n: [] for n in G_input.nodes()}
+    node_to_hyperedges: Dict = {n: [] for n in node_list}
 
-    # main loop: while there are edges left in G
-    while G.number_of_edges() > 0:
-        # find highest-degree node (deterministic tie-break)
-        # guard: if graph became empty of nodes, break
-        if G.number_of_nodes() == 0:
+    # lazy max-heap over mutable degrees: the per-iteration max() scan over all
+    # nodes was O(N) each round, making the loop O(N*E) overall. We keep degrees
+    # in a flat list, push (-degree, node) entries and skip stale ones on pop,
+    # so finding the current max is O(log N) amortized.
+    deg = [len(s) for s in adj]
+    heap = [(-d, i) for i, d in enumerate(deg) if d > 0]
+    heapq.heapify(heap)
+
+    # one visited mask for every BFS in the loop: each call only marks the
+    # nodes it returns, so resetting those few slots afterwards is far cheaper
+    # than allocating a fresh N-byte mask thousands of times
+    visited = bytearray(N)
+
+    # main loop: while there are edges left
+    n_edges = sum(deg) // 2
+    while n_edges > 0:
+        # pop until a fresh (degree-matching) entry surfaces
+        while heap:
+            d_neg, node = heapq.heappop(heap)
+            if deg[node] == -d_neg and deg[node] > 0:
+                break
+        else:
             break
-        # pick highest-degree node (deterministic by node's hash if tie)
-        # safer deterministic ordering: sort nodes by (degree, node id)
-        # here we use tuple (degree, -hash(node)) so larger degree -> selected
-        node = max(G.nodes(), key=lambda n: (G.degree(n), -hash(n)))
 
-        # run BFS to collect up to m_max nodes
-        Ve_list = bfs_collect_m(G, node, m_max)
+        # run BFS to collect up to m_max nodes, then clear only the touched
+        # slots (the mask marks exactly the nodes it returns)
+        Ve_list = _bfs_collect_m_flat(adj, node, m_max, visited)
+        for i in Ve_list:
+            visited[i] = 0
         Ve_set = set(Ve_list)
         if len(Ve_set) == 0:
             # nothing to add (shouldn't happen), break to avoid infinite loop
@@ -62,27 +122,42 @@ def create_fhs(G_input: nx.Graph, m_max: int, use_edge_capacity: bool = True):
 
         # add hyperedge
         hed_idx = len(hyperedges)
-        hyperedges.append(frozenset(Ve_set))
+        hyperedges.append(frozenset(node_list[i] for i in Ve_set))
         for v in Ve_set:
-            node_to_hyperedges[v].append(hed_idx)
+            node_to_hyperedges[node_list[v]].append(hed_idx)
 
-        # remove edges internal to Ve from G
-        # create list to remove to avoid modifying while iterating
-        internal_edges = [(u, v) for u in Ve_set for v in G.neighbors(u) if v in Ve_set and u < v]
-        G.remove_edges_from(internal_edges)
+        # remove edges internal to Ve in a single set pass: no edge-tuple list
+        # is built and each edge disappears from both endpoint sets exactly once
+        for u in Ve_set:
+            rm = adj[u] & Ve_set
+            if not rm:
+                continue
+            adj[u] -= rm
+            n_edges -= len(rm)
+            deg[u] -= len(rm)
+            for v in rm:
+                adj[v].discard(u)
+                deg[v] -= 1
 
-        # remove now-isolated nodes from G
-        isolated = [n for n, d in G.degree() if d == 0]
-        if isolated:
-            G.remove_nodes_from(isolated)
+        # nodes whose degree dropped to zero simply stay inactive (their heap
+        # entries go stale); the rest get re-pushed with their new degree
+        for x in Ve_set:
+            if deg[x] > 0:
+                heapq.heappush(heap, (-deg[x], x))
 
     # Optional: capacity distribution like in NCH:
     node_capacity_in_hyperedge: Dict[Tuple, float] = {}
     if use_edge_capacity:
-        # detect if capacities exist
-        has_capacity_attr = any('capacity' in d for _, _, d in G_input.edges(data=True))
-        if has_capacity_attr:
-            # compute node_total from original graph (sum of incident edge capacities)
+        node_total = None
+        if edges_df is not None and 'capacity' in edges_df.columns:
+            # vectorized groupby-sum per endpoint over the original DataFrame
+            # (both endpoints credited, as below)
+            cap = pd.to_numeric(edges_df['capacity'], errors='coerce').fillna(0.0)
+            s = cap.groupby(edges_df['src'], sort=False).sum()
+            t = cap.groupby(edges_df['trg'], sort=False).sum()
+            node_total = s.add(t, fill_value=0.0).to_dict()
+        elif any('capacity' in d for _, _, d in G_input.edges(data=True)):
+            # fallback: compute node_total by iterating the graph's edge view
             node_total = {n: 0.0 for n in G_input.nodes()}
             for u, v, data in G_input.edges(data=True):
                 cap = float(data.get('capacity', 0.0))
@@ -90,34 +165,34 @@ def create_fhs(G_input: nx.Graph, m_max: int, use_edge_capacity: bool = True):
                 node_total[u] += cap
                 node_total[v] += cap
 
-            # split node_total evenly across hyperedges the node participates in
-            for v, hed_idxs in node_to_hyperedges.items():
-                if not hed_idxs:
-                    continue
-                total_v = node_total.get(v, 0.0)
-                per_hed = total_v / len(hed_idxs)
-                for idx in hed_idxs:
-                    node_capacity_in_hyperedge[(v, idx)] = per_hed
+        # split node_total (or uniform 1.0) evenly across the hyperedges each
+        # node participates in: pack the incidences into CSR once and do all
+        # the per-node divisions and share expansion as whole-array numpy ops
+        n2h_indptr, n2h_hids = n2h_to_csr(node_to_hyperedges, idx_of)
+        counts = np.diff(n2h_indptr)
+        if node_total is not None:
+            totals = np.fromiter((node_total.get(n, 0.0) for n in node_list),
+                                 dtype=np.float64, count=N)
         else:
             # fallback: uniform 1.0 split
-            for v, hed_idxs in node_to_hyperedges.items():
-                if not hed_idxs:
-                    continue
-                per_hed = 1.0 / len(hed_idxs)
-                for idx in hed_idxs:
-                    node_capacity_in_hyperedge[(v, idx)] = per_hed
+            totals = np.ones(N, dtype=np.float64)
+        per_node = np.repeat(totals / np.maximum(counts, 1), counts)
+        owners = np.repeat(np.arange(N), counts)
+        node_capacity_in_hyperedge = {
+            (node_list[i], h): c
+            for i, h, c in zip(owners.tolist(), n2h_hids.tolist(), per_node.tolist())
+        }
 
     return hyperedges, node_to_hyperedges, node_capacity_in_hyperedge
 
 
 # quick self-test / demo
 if __name__ == "__main__":
-    G = nx.Graph()
-    G.add_edges_from([
+    G = Graph()
+    for u, v in [
         (1,2),(1,3),(1,4),(2,5),(3,6),(4,7),(5,6),(6,7),(7,8),(8,9),(9,10)
-    ])
-    for u, v in G.edges():
-        G.edges[u,v]['capacity'] = 100.0
+    ]:
+        G.add_edge(u, v, capacity=100.0)
 
     hyperedges, n2h, caps = create_fhs(G, m_max=3, use_edge_capacity=True)
     print("Hyperedges:")
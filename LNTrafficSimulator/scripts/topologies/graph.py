@@ -0,0 +1,85 @@
+# topologies/graph.py
+"""
+Minimal undirected graph for the topology builders.
+
+Replaces networkx.Graph on the hot paths: plain dict-of-set adjacency plus an
+optional per-edge capacity map. No per-node/per-edge attribute dicts, no view
+objects - neighbor iteration and degree lookups are direct set/dict operations.
+Only the small API subset the builders actually use is implemented.
+"""
+from typing import Dict, Set
+
+
+class Graph:
+    def __init__(self):
+        self._adj: Dict[object, Set] = {}
+        # capacities keyed by frozenset({u, v}) so edge direction never matters
+        self._caps: Dict[frozenset, float] = {}
+
+    def add_node(self, n):
+        self._adj.setdefault(n, set())
+
+    def add_edge(self, u, v, capacity=None):
+        self._adj.setdefault(u, set()).add(v)
+        self._adj.setdefault(v, set()).add(u)
+        if capacity is not None:
+            self._caps[frozenset((u, v))] = float(capacity)
+
+    def add_edges_from(self, edges):
+        for u, v in edges:
+            self.add_edge(u, v)
+
+    def remove_edge(self, u, v):
+        self._adj[u].discard(v)
+        self._adj[v].discard(u)
+        self._caps.pop(frozenset((u, v)), None)
+
+    def remove_edges_from(self, edges):
+        for u, v in edges:
+            self.remove_edge(u, v)
+
+    def remove_node(self, n):
+        for m in self._adj.pop(n, ()):
+            self._adj[m].discard(n)
+            self._caps.pop(frozenset((n, m)), None)
+
+    def remove_nodes_from(self, nodes):
+        for n in nodes:
+            self.remove_node(n)
+
+    def nodes(self):
+        return self._adj.keys()
+
+    def neighbors(self, n):
+        return self._adj[n]
+
+    def degree(self, n=None):
+        if n is not None:
+            return len(self._adj[n])
+        return ((m, len(s)) for m, s in self._adj.items())
+
+    def number_of_nodes(self):
+        return len(self._adj)
+
+    def number_of_edges(self):
+        return sum(len(s) for s in self._adj.values()) // 2
+
+    def edges(self, data=False):
+        seen = set()
+        for u, s in self._adj.items():
+            for v in s:
+                key = frozenset((u, v))
+                if key in seen:
+                    continue
+                seen.add(key)
+                if data:
+                    cap = self._caps.get(key)
+                    yield u, v, ({} if cap is None else {'capacity': cap})
+                else:
+                    yield u, v
+
+    def copy(self):
+        H = Graph.__new__(Graph)
+        H._adj = {n: set(s) for n, s in self._adj.items()}
+        H._caps = dict(self._caps)
+        return H
@@ -5,28 +5,50 @@ Create NCH hyperedges:
  - for each cover node c, create hyperedge H_c = neighbors(c)
  - compute node_to_hyperedges mapping and default node_caps (empty)
 """
-from collections import defaultdict
-import networkx as nx
+import numpy as np
+from .graph import Graph
 
 def greedy_vertex_cover(G, max_nodes=None):
     """
     Greedy approx vertex cover: repeatedly pick node with highest degree,
     add to cover and remove incident edges until no edges remain or max_nodes reached.
+
+    Uses a bucket queue (degeneracy-ordering style): bucket[d] holds the nodes
+    of degree d and a max_d pointer only ever moves down, so the whole cover
+    is built in O(V+E) - no heap, no stale entries. Ties break on the smaller
+    node id, matching the previous heap ordering.
     """
-    H = G.copy()
+    adj = {n: set(G.neighbors(n)) for n in G.nodes()}
+    deg = {n: len(s) for n, s in adj.items()}
+    max_d = max(deg.values(), default=0)
+    bucket = [set() for _ in range(max_d + 1)]
+    for n, d in deg.items():
+        bucket[d].add(n)
     cover = set()
-    # degree dict
-    while H.number_of_edges() > 0:
-        # choose node with max degree
-        node, deg = max(H.degree(), key=lambda x: x[1])
+    n_edges = sum(deg.values()) // 2
+    while n_edges > 0:
+        while max_d > 0 and not bucket[max_d]:
+            max_d -= 1
+        if max_d == 0:
+            break
+        node = min(bucket[max_d])
+        bucket[max_d].discard(node)
         cover.add(node)
-        # remove node and its edges
-        H.remove_node(node)
+        # remove node and its edges, moving only its neighbors down one bucket
+        nbrs = adj.pop(node)
+        n_edges -= len(nbrs)
+        del deg[node]
+        for m in nbrs:
+            adj[m].discard(node)
+            d = deg[m]
+            bucket[d].discard(m)
+            deg[m] = d - 1
+            bucket[d - 1].add(m)
         if max_nodes is not None and len(cover) >= max_nodes:
             break
     return cover
 
-def create_nch(G: nx.Graph, max_cover_size=None, use_edge_capacity: bool = False):
+def create_nch(G: Graph, max_cover_size=None, use_edge_capacity: bool = False):
     """
     Build NCH hyperedges from graph G.
     Returns:
@@ -38,16 +60,36 @@ def create_nch(G: nx.Graph, max_cover_size=None, use_edge_capacity: bool = False
       use_edge_capacity: if True, downstream script should compute actual capacity splits.
     """
     cover = greedy_vertex_cover(G, max_nodes=max_cover_size)
+
+    # remap nodes to 0..N-1 once and lay neighbor lists out as CSR slices:
+    # each cover node's hyperedge is then a contiguous int32 view instead of a
+    # fresh Python set, and node_to_hyperedges accumulates in a plain
+    # list-of-lists indexed by int id (translated back at the end)
+    node_list = list(G.nodes())
+    N = len(node_list)
+    idx_of = {n: i for i, n in enumerate(node_list)}
+    indptr = np.zeros(N + 1, dtype=np.int64)
+    for i, n in enumerate(node_list):
+        indptr[i + 1] = indptr[i] + G.degree(n)
+    members = np.empty(int(indptr[-1]), dtype=np.int32)
+    pos = 0
+    for n in node_list:
+        for m in G.neighbors(n):
+            members[pos] = idx_of[m]
+            pos += 1
+
     hyperedges = []
-    node_to_hyperedges = defaultdict(list)
-    for idx, c in enumerate(sorted(list(cover))):
-        neighs = set(G.neighbors(c))
-        if len(neighs) == 0:
+    n2h_int = [[] for _ in range(N)]
+    for c in sorted(cover):
+        ci = idx_of[c]
+        neighs = members[indptr[ci]:indptr[ci + 1]]
+        if neighs.size == 0:
             continue
-        hed = frozenset(neighs)
-        hyperedges.append(hed)
-        for v in hed:
-            node_to_hyperedges[v].append(idx)
+        idx = len(hyperedges)
+        hyperedges.append(frozenset(node_list[x] for x in neighs))
+        for x in neighs:
+            n2h_int[x].append(idx)
+    node_to_hyperedges = {node_list[i]: lst for i, lst in enumerate(n2h_int) if lst}
 
     # node_caps remains empty here; caller can compute deposits using original capacities
     node_capacity_in_hyperedge = {}
@@ -55,4 +97,4 @@ def create_nch(G: nx.Graph, max_cover_size=None, use_edge_capacity: bool = False
         # placeholder: caller should fill node_capacity_in_hyperedge based on original capacities
         pass
 
-    return hyperedges, dict(node_to_hyperedges), node_capacity_in_hyperedge
+    return hyperedges, node_to_hyperedges, node_capacity_in_hyperedge
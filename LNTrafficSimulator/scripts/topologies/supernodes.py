@@ -1,147 +1,262 @@
 # topologies/supernodes.py
-import networkx as nx
-from collections import deque
+import functools
+import numpy as np
 from typing import Set, Dict
+from .graph import Graph
 
-def select_supernodes(G: nx.Graph, max_search_depth: int = 4, max_states: int = 5000) -> Set:
+try:
+    from numba import njit
+except ImportError:  # numba is optional; plain-Python fallback below
+    njit = None
+
+
+# open-addressed seen table shared across monotone-path calls: preallocated
+# once, cleared between calls by rewinding only the touched slots. -1 marks an
+# empty slot; state keys are always non-negative. Size must be a power of two.
+_SEEN_TABLE = np.full(1 << 17, -1, dtype=np.int64)
+_SEEN_TOUCHED = np.empty(1 << 17, dtype=np.int64)
+
+
+def _exists_monotone_path_csr(u, v, Vn_mask, indptr, indices, ids, max_depth,
+                              max_states, seen_table, seen_touched):
     """
-    Select supernodes following Algorithm 1 (practical version).
-    - G: undirected NetworkX graph
-    - max_search_depth: maximum path length (edges) to consider when searching for monotone paths
-    - max_states: safety cap for number of BFS states explored in exists_monotone_path
-    Returns: set S of chosen supernodes
+    True if a path u->v of length <= max_depth exists inside the Vn_mask
+    subgraph whose internal nodes have strictly decreasing ids. CSR/int port
+    of the old tuple-state BFS: a state is fully determined by the node (its
+    prev id is always its own), so the state key (nb << 32) | prev collapses
+    to per-node dedup. Seen states live in the shared linear-probe table -
+    two array reads per check instead of a fresh per-call visited array.
+    prev is the internal-node index of the previous hop, -1 before any
+    internal node.
     """
+    if u == v:
+        return True
+    if Vn_mask[u] == 0 or Vn_mask[v] == 0:
+        return False
+    n = Vn_mask.shape[0]
+    mask_t = seen_table.shape[0] - 1
+    q_node = np.empty(n + 2, dtype=np.int64)
+    q_prev = np.empty(n + 2, dtype=np.int64)
+    q_depth = np.empty(n + 2, dtype=np.int64)
+    q_node[0] = u
+    q_prev[0] = -1
+    q_depth[0] = 0
+    head = 0
+    tail = 1
+    states = 0
+    n_touched = 0
+    found = False
+    while head < tail:
+        cur = q_node[head]
+        prev = q_prev[head]
+        depth = q_depth[head]
+        head += 1
+        states += 1
+        if states > max_states:
+            # give up (treat as not found to be conservative)
+            break
+        if depth >= max_depth:
+            continue
+        s = indptr[cur]
+        e = indptr[cur + 1]
+        # neighbor slices are sorted by descending id. The destination check
+        # must cover the whole slice (v is never an internal node), so locate
+        # v by binary-searching for its id and walking the equal-id run
+        vid = ids[v]
+        a = s
+        b = e
+        while a < b:
+            mid = (a + b) // 2
+            if ids[indices[mid]] > vid:
+                a = mid + 1
+            else:
+                b = mid
+        k = a
+        while k < e and ids[indices[k]] == vid:
+            if indices[k] == v:
+                found = True
+                break
+            k += 1
+        if found:
+            break
+        # expansion: once an internal node is on the path only strictly
+        # smaller ids can extend it, and those sit in the slice suffix -
+        # binary search for the cut instead of filtering every neighbor
+        if prev >= 0:
+            bound = ids[prev]
+            a = s
+            b = e
+            while a < b:
+                mid = (a + b) // 2
+                if ids[indices[mid]] >= bound:
+                    a = mid + 1
+                else:
+                    b = mid
+            start_k = a
+        else:
+            start_k = s
+        for k in range(start_k, e):
+            nb = np.int64(indices[k])
+            if nb == v or Vn_mask[nb] == 0:
+                continue
+            # probe the seen table for state key (nb << 32) | prev (== nb here)
+            key = (nb << 32) | nb
+            slot = (key ^ (key >> 17) ^ (key >> 34)) & mask_t
+            present = False
+            while True:
+                got = seen_table[slot]
+                if got == key:
+                    present = True
+                    break
+                if got == -1:
+                    break
+                slot = (slot + 1) & mask_t
+            if present:
+                continue
+            if n_touched >= mask_t:
+                # table full - treat as not found rather than probe forever
+                break
+            seen_table[slot] = key
+            seen_touched[n_touched] = slot
+            n_touched += 1
+            q_node[tail] = nb
+            q_prev[tail] = nb
+            q_depth[tail] = depth + 1
+            tail += 1
+        if found or n_touched >= mask_t:
+            break
+    # rewind only the slots this call wrote
+    for i in range(n_touched):
+        seen_table[seen_touched[i]] = -1
+    return found
+
+
+if njit is not None:
+    _exists_monotone_path_csr = njit(cache=True)(_exists_monotone_path_csr)
+
+
+# per-process working state for _node_is_removable; populated by _init_worker
+# before the selection loop runs (in this process or in pool workers)
+_WORK: Dict = {}
+
+
+def _init_worker(neigh, idx_of, indptr, indices, ids, max_depth, max_states):
+    _WORK.update(neigh=neigh, idx_of=idx_of, indptr=indptr, indices=indices,
+                 ids=ids, max_depth=max_depth, max_states=max_states,
+                 Vn_mask=np.zeros(len(idx_of), dtype=np.uint8))
+
+
+def _node_is_removable(n):
+    """Per-node decision of Algorithm 1; depends only on the static graph in
+    _WORK, so nodes can be sharded across processes. Top-level so it pickles."""
+    neigh = _WORK['neigh']
+    NGn = neigh[n]
+
+    # triangle early-exit: any edge between two neighbors of n settles the
+    # decision with one C-level set intersection per neighbor
+    for u in NGn:
+        if NGn & neigh[u] - {u}:
+            return True
+
+    # no triangle: monotone-path search over neighbor pairs within two hops
+    idx_of = _WORK['idx_of']
+    Vn_mask = _WORK['Vn_mask']
+    Vn = neigh[n].union({n}, *(neigh[m] for m in NGn))
+    Vn_idxs = [idx_of[m] for m in Vn]
+    for i_m in Vn_idxs:
+        Vn_mask[i_m] = 1
+    removable = False
+    NGn_list = list(NGn)
+    ln = len(NGn_list)
+    for i in range(ln):
+        if removable:
+            break
+        u = NGn_list[i]
+        for j in range(i + 1, ln):
+            v = NGn_list[j]
+            if _exists_monotone_path_csr(idx_of[u], idx_of[v], Vn_mask,
+                                         _WORK['indptr'], _WORK['indices'],
+                                         _WORK['ids'], _WORK['max_depth'],
+                                         _WORK['max_states'],
+                                         _SEEN_TABLE, _SEEN_TOUCHED):
+                removable = True
+                break
+    # reset only the touched mask slots for the next node
+    for i_m in Vn_idxs:
+        Vn_mask[i_m] = 0
+    return removable
+
 
+@functools.lru_cache(maxsize=4)
+def _prepare_graph(G: Graph):
+    """
+    Precompute the static per-graph structures the selection loop needs:
+    (node_list, idx_of, ids, neigh, indptr, indices). Cached on graph identity
+    (Graph does not override __hash__/__eq__), so repeated select_supernodes
+    calls on the same object - and create_supernode_hyperedges right after -
+    skip the O(V+E) rebuild. The cache holds strong references to up to 4
+    graphs and goes stale if a cached graph is mutated afterwards.
+    """
     # deterministic integer id map for nodes (used in monotonicity check)
     node_list = list(G.nodes())
-    id_map: Dict = {}
+    N = len(node_list)
+    idx_of: Dict = {n: i for i, n in enumerate(node_list)}
+    ids = np.empty(N, dtype=np.int64)
     for i, n in enumerate(node_list):
         try:
-            id_map[n] = int(n)
-        except Exception:
-            id_map[n] = i
-
-    S = set(G.nodes())
+            ids[i] = int(n)
+        except (TypeError, ValueError):
+            ids[i] = i
 
     # Precompute neighbor sets for speed
     neigh = {n: set(G.neighbors(n)) for n in G.nodes()}
 
-    def two_hop_nodes(n):
-        # BFS up to depth 2, return set of nodes within 2 hops (including n)
-        visited = {n}
-        q = deque([(n, 0)])
-        while q:
-            cur, d = q.popleft()
-            if d >= 2:
-                continue
-            for nb in neigh[cur]:
-                if nb not in visited:
-                    visited.add(nb)
-                    q.append((nb, d + 1))
-        return visited
-
-    def exists_monotone_path(u, v, Vn_set, max_depth, max_states_local):
-        """
-        Return True if there exists a simple path from u to v inside Vn_set of length <= max_depth
-        whose internal nodes (excluding u and v) have strictly decreasing id() values
-        along the path: id(u2) > id(u3) > ... > id(ul-1).
-
-        Implementation notes:
-         - We treat states as (current_node, prev_internal_id)
-         - prev_internal_id is None if we haven't visited any internal node yet (i.e., at start).
-         - We maintain a seen_states set of (node, prev_internal_id) to avoid duplicate work.
-         - We cap number of explored states to max_states_local to avoid explosion.
-        """
-        if u == v:
-            return True
-        # quick check: both must be in Vn_set
-        if u not in Vn_set or v not in Vn_set:
-            return False
-
-        # BFS queue: (current_node, prev_internal_id, depth)
-        q = deque()
-        # initial: at u, no internal yet, depth=0
-        q.append((u, None, 0))
-        seen_states = set()
-        # count visited states to avoid explosion
-        states_explored = 0
-
-        while q:
-            cur, prev_internal_id, depth = q.popleft()
-            # safety
-            states_explored += 1
-            if states_explored > max_states_local:
-                # give up (treat as not found to be conservative)
-                return False
-
-            if depth >= max_depth:
-                continue
+    # CSR adjacency over internal indices for the monotone-path kernel: the
+    # inner BFS is a pure integer loop, so it runs jitted (or at worst over
+    # flat arrays) instead of through per-node Python set dispatch
+    indptr = np.zeros(N + 1, dtype=np.int32)
+    for i, n in enumerate(node_list):
+        indptr[i + 1] = indptr[i] + len(neigh[n])
+    indices = np.empty(int(indptr[-1]), dtype=np.int32)
+    pos = 0
+    for n in node_list:
+        for m in neigh[n]:
+            indices[pos] = idx_of[m]
+            pos += 1
 
-            for nb in neigh[cur]:
-                if nb not in Vn_set:
-                    continue
-                # skip returning to already visited nodes along the same path by using seen_states
-                # state key depends on whether we have started internal monotone sequence
-                if nb == v:
-                    # reaching destination: check monotone constraint for the last internal if needed
-                    if prev_internal_id is None:
-                        return True
-                    # If prev_internal_id exists, ensure prev_internal_id > id(v) only if v counts as internal
-                    # but v is destination so we allow it. The monotone rule applies only to internal nodes,
-                    # so reaching v is always allowed (we enforced monotonicity while traversing internal nodes).
-                    return True
-
-                # nb is an internal candidate (not u and not v)
-                if prev_internal_id is None:
-                    # first internal node after u: allowed, set new prev_internal_id = id(nb)
-                    new_state = (nb, id_map.get(nb, 0))
-                    if new_state in seen_states:
-                        continue
-                    seen_states.add(new_state)
-                    q.append((nb, new_state[1], depth + 1))
-                else:
-                    # must have strictly decreasing ids: prev_internal_id > id(nb)
-                    nb_id = id_map.get(nb, 0)
-                    if prev_internal_id > nb_id:
-                        new_state = (nb, nb_id)
-                        if new_state in seen_states:
-                            continue
-                        seen_states.add(new_state)
-                        q.append((nb, nb_id, depth + 1))
-                    else:
-                        # cannot extend this neighbor because monotonicity violated
-                        continue
+    # sort every neighbor slice by descending id: the monotone-path kernel can
+    # then binary-search for the first id below its current bound and iterate
+    # only that suffix, instead of filtering each neighbor one by one
+    for i in range(N):
+        s, e = int(indptr[i]), int(indptr[i + 1])
+        if e - s > 1:
+            sl = indices[s:e]
+            indices[s:e] = sl[np.argsort(-ids[sl], kind='stable')]
 
-        return False
+    return node_list, idx_of, ids, neigh, indptr, indices
 
-    # Main selection loop
-    for n in list(G.nodes()):
-        Vn = two_hop_nodes(n)
-        Vn_set = Vn  # already a set
-        NGn = neigh[n]
-        removed = False
-        NGn_list = list(NGn)
-        ln = len(NGn_list)
-        for i in range(ln):
-            if removed:
-                break
-            u = NGn_list[i]
-            for j in range(i + 1, ln):
-                v = NGn_list[j]
-                # quick check: if neighbors directly connected => remove n
-                if v in neigh[u]:
-                    if n in S:
-                        S.discard(n)
-                    removed = True
-                    break
-                # otherwise, try to find a monotone path within Vn up to max_search_depth
-                # but first cheap check: both u and v must be in Vn_set (they should be)
-                if u not in Vn_set or v not in Vn_set:
-                    continue
-                found = exists_monotone_path(u, v, Vn_set, max_search_depth, max_states)
-                if found:
-                    if n in S:
-                        S.discard(n)
-                    removed = True
-                    break
-    return S
+
+def select_supernodes(G: Graph, max_search_depth: int = 4, max_states: int = 5000,
+                      jobs: int = 1) -> Set:
+    """
+    Select supernodes following Algorithm 1 (practical version).
+    - G: undirected graph (topologies.graph.Graph)
+    - max_search_depth: maximum path length (edges) to consider when searching for monotone paths
+    - max_states: safety cap for number of BFS states explored in exists_monotone_path
+    - jobs: worker processes for the per-node loop (1 = sequential); each
+      node's decision depends only on the static input graph, so the loop is
+      embarrassingly parallel
+    Returns: set S of chosen supernodes
+    """
+    node_list, idx_of, ids, neigh, indptr, indices = _prepare_graph(G)
+
+    init_args = (neigh, idx_of, indptr, indices, ids, max_search_depth, max_states)
+    if jobs and jobs > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                 initargs=init_args) as ex:
+            flags = list(ex.map(_node_is_removable, node_list, chunksize=64))
+        return {n for n, rm in zip(node_list, flags) if not rm}
+
+    _init_worker(*init_args)
+    return {n for n in node_list if not _node_is_removable(n)}
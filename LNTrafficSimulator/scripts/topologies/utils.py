@@ -1,24 +1,79 @@
 # topologies/utils.py
-import networkx as nx
+import numpy as np
 import pandas as pd
-from .supernodes import select_supernodes
+from .graph import Graph
+from .supernodes import select_supernodes, _prepare_graph
+
+def to_csr(hyperedges, node_to_idx):
+    """
+    Pack hyperedges (iterables of node ids) into SoA CSR arrays:
+    indptr int32[K+1] and members int32[sum of sizes] holding internal node
+    indices from node_to_idx. Iterating a hyperedge then becomes slicing
+    members[indptr[i]:indptr[i+1]] - a contiguous int view instead of a
+    frozenset of boxed ids - and the whole structure is numpy/numba friendly.
+    The frozenset form stays the constructors' return format; convert with
+    this helper where the downstream math wants flat arrays.
+    """
+    K = len(hyperedges)
+    indptr = np.zeros(K + 1, dtype=np.int32)
+    for i, h in enumerate(hyperedges):
+        indptr[i + 1] = indptr[i] + len(h)
+    members = np.empty(int(indptr[-1]), dtype=np.int32)
+    pos = 0
+    for h in hyperedges:
+        for n in h:
+            members[pos] = node_to_idx[n]
+            pos += 1
+    return indptr, members
+
+def n2h_to_csr(node_to_hyperedges, node_to_idx):
+    """
+    Same packing for the node -> hyperedge-indices mapping: returns
+    indptr int32[N+1] and hids int32[sum of incidences], with rows ordered by
+    the internal index from node_to_idx (nodes without incidences get empty
+    rows). "Every hyperedge this node is in" becomes a slice lookup.
+    """
+    N = len(node_to_idx)
+    counts = np.zeros(N, dtype=np.int32)
+    for n, idxs in node_to_hyperedges.items():
+        counts[node_to_idx[n]] = len(idxs)
+    indptr = np.zeros(N + 1, dtype=np.int32)
+    np.cumsum(counts, out=indptr[1:])
+    hids = np.empty(int(indptr[-1]), dtype=np.int32)
+    for n, idxs in node_to_hyperedges.items():
+        pos = indptr[node_to_idx[n]]
+        for h in idxs:
+            hids[pos] = h
+            pos += 1
+    return indptr, hids
 
 def edges_df_to_nx(edges_df):
-    G = nx.Graph()
-    for _, r in edges_df.iterrows():
-        G.add_edge(r['src'], r['trg'])
+    G = Graph()
+    # single pass over a plain ndarray: iterrows() builds a Series per row,
+    # which dominates graph-construction time on large snapshots
+    arr = edges_df[['src', 'trg']].to_numpy()
+    for s, t in zip(arr[:, 0], arr[:, 1]):
+        G.add_edge(s, t)
     return G
 
 def create_lnrollup_hyperedges(G):
-    # single hyperedge of all nodes
-    return [frozenset(G.nodes())], {n:[0] for n in G.nodes()}, { (n,0): 1.0 for n in G.nodes() }
+    # single hyperedge of all nodes; every node belongs to hyperedge 0, so the
+    # mapping shares one immutable (0,) tuple via dict.fromkeys instead of
+    # allocating N singleton lists
+    nodes = list(G.nodes())
+    node_to_hyperedges = dict.fromkeys(nodes, (0,))
+    node_capacity = {(n, 0): 1.0 for n in nodes}
+    return [frozenset(nodes)], node_to_hyperedges, node_capacity
 
 def create_supernode_hyperedges(G):
     S = select_supernodes(G)
+    # select_supernodes just cached the prepared structures for G, so the
+    # neighbor sets come back from _prepare_graph instead of re-walking G
+    neigh = _prepare_graph(G)[3]
     hyperedges = []
     node_to_hyperedges = {n: [] for n in G.nodes()}
     for i, s in enumerate(S):
-        neighbors = set(G.neighbors(s))
+        neighbors = neigh[s]
         if not neighbors:
             continue
         hed = frozenset(neighbors)
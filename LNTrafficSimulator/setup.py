@@ -7,6 +7,7 @@ install_requires = [
     "matplotlib",
     "seaborn",
     "tqdm",
+    "ijson",
 ]
 
 #setup_requires = ['pytest-runner']